@@ -2,68 +2,110 @@
 API routes for the chatbot application.
 """
 
+import json
 import logging
 from datetime import date, datetime
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Header, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from app.config import settings
 from app.models import ChatResponse
 from app.services import (
     emotion_service,
     chatbot_service,
+    storage_service,
+    tts_service,
 )
 from app.services.chat_history import save_message, get_recent_messages, get_emotion_stats_by_date
 from app.services.auth import get_user_id_from_token
+from app.services.audio import AudioUpload, AudioValidationError, read_wav_upload
+from app.services.cache import (
+    IdempotencyConflict,
+    IdempotencyInProgress,
+    IdempotencyStore,
+    LRUCache,
+    content_hash,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Completed /chat requests, keyed by (user, Idempotency-Key)
+idempotency_store = IdempotencyStore(
+    LRUCache(
+        max_entries=settings.IDEMPOTENCY_CACHE_MAX_ENTRIES,
+        max_bytes=settings.IDEMPOTENCY_CACHE_MAX_BYTES,
+        ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+        sizeof=lambda entry: len(json.dumps(entry, ensure_ascii=False).encode("utf-8")),
+    )
+)
 
-def _validate_audio_file(file: UploadFile) -> None:
-    """Validate audio file."""
-    # Check file size
-    if file.size and file.size > settings.MAX_AUDIO_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File quá lớn (max {settings.MAX_AUDIO_SIZE / (1024*1024):.0f}MB)",
-        )
 
+def _idempotency_cache_key(idempotency_key: str, user_id: str | None) -> str:
+    """
+    Scope an idempotency key to the caller so keys cannot collide across users.
+
+    Keyed on user_id rather than the token, which rotates on refresh.
+    Anonymous callers share one bucket; the payload fingerprint still stops
+    them from replaying each other's different messages.
+    """
+    scope = f"user:{user_id}" if user_id else "anonymous"
+    return content_hash(f"{scope}\n{idempotency_key}".encode("utf-8"))
+
+
+def _payload_fingerprint(audio: AudioUpload, text: str) -> str:
+    """Hash of the request payload, to detect an idempotency key reused for another message."""
+    return content_hash(f"{audio.digest}\n{text}".encode("utf-8"))
+
+
+async def _read_audio_file(file: UploadFile) -> AudioUpload:
+    """Validate audio file while streaming it from the spooled upload."""
     # Check content type - WAV only
     if file.content_type not in ["audio/wav", "audio/x-wav"]:
         raise HTTPException(status_code=400, detail="Chỉ hỗ trợ định dạng WAV")
 
+    # Check header, size and duration without loading the whole file
+    try:
+        return await read_wav_upload(
+            file,
+            max_bytes=settings.MAX_AUDIO_SIZE,
+            max_duration=settings.MAX_AUDIO_DURATION_SECONDS,
+        )
+    except AudioValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     file: UploadFile = File(...),
     text: str = Form(default=""),
     authorization: str = Header(default=None),
+    idempotency_key: str = Header(default=None),
+    tts: bool = Form(default=False),
 ):
     """
     Main chat endpoint - Processes audio + saves to DB if user logged in.
+
+    If an `Idempotency-Key` header is sent, a retried request with the same key
+    returns the original response without calling the LLM or saving messages again.
+    Reusing a key for a different audio/text payload is rejected with 422.
+
+    Send `tts=true` to get the reply synthesized server-side in `audio_urls`
+    (off by default: the web client still speaks replies in the browser).
+    Logged-in clients can instead stream it from /tts/stream for earlier
+    playback; /tts/stream requires a token, so anonymous callers only have
+    the `tts=true` path. Both share the same per-sentence cached files.
     """
+    replay_key = None
     try:
-        # Validate
-        _validate_audio_file(file)
-
-        # Read audio
-        audio_bytes = await file.read()
-        if not audio_bytes:
-            raise HTTPException(400, "Audio file is empty")
+        # Validate + hash audio
+        audio = await _read_audio_file(file)
 
         # User text (required)
         user_text = (text or "").strip()
         if not user_text:
             raise HTTPException(400, "Thiếu 'text' từ frontend STT")
 
-        logger.info(
-            f"Processing chat: text_len={len(user_text)}, audio_size={len(audio_bytes)} bytes"
-        )
-
-        # Emotion Detection from audio
-        emotion_result = emotion_service.predict(audio_bytes)
-        emotion = emotion_result["emotion"]
-        confidence = emotion_result["confidence"]
-
         # Get user_id from token if provided
         user_id = None
         if authorization:
@@ -72,6 +114,31 @@ async def chat(
             except Exception as auth_err:
                 logger.warning(f"Auth failed: {auth_err}")
 
+        # Replay stored response for retried requests; otherwise mark the key
+        # in flight so a concurrent retry cannot run the pipeline twice
+        if idempotency_key:
+            key = _idempotency_cache_key(idempotency_key, user_id)
+            try:
+                cached_response = idempotency_store.begin(key, _payload_fingerprint(audio, user_text))
+            except IdempotencyConflict as e:
+                raise HTTPException(status_code=422, detail=str(e))
+            except IdempotencyInProgress as e:
+                raise HTTPException(status_code=409, detail=str(e))
+
+            if cached_response is not None:
+                logger.info("Replaying cached response for idempotency key")
+                return ChatResponse(**cached_response)
+            replay_key = key
+
+        logger.info(
+            f"Processing chat: text_len={len(user_text)}, audio_size={audio.size} bytes"
+        )
+
+        # Emotion Detection from audio
+        emotion_result = emotion_service.predict(audio.file, cache_key=audio.digest)
+        emotion = emotion_result["emotion"]
+        confidence = emotion_result["confidence"]
+
         # Save user message if logged in
         if user_id:
             try:
@@ -115,20 +182,82 @@ async def chat(
             except Exception as save_err:
                 logger.error(f"Failed to save assistant message: {save_err}")
 
+        # Text-to-speech (cached per sentence)
+        audio_urls = []
+        if tts:
+            try:
+                # CPU-bound; keep it off the event loop
+                audio_urls = await run_in_threadpool(tts_service.synthesize, reply_text)
+            except Exception as tts_err:
+                logger.error(f"TTS failed: {tts_err}", exc_info=True)
+
         logger.info(f"Chat completed: emotion={emotion}, confidence={confidence:.2f}")
 
-        return ChatResponse(
+        response = ChatResponse(
             user_text=user_text,
             reply_text=reply_text,
             emotion=emotion,
             confidence=confidence,
+            audio_urls=audio_urls,
         )
 
+        if replay_key:
+            idempotency_store.complete(replay_key, response.model_dump())
+            replay_key = None
+
+        return response
+
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Chat endpoint error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
+    finally:
+        if replay_key:
+            idempotency_store.release(replay_key)
+
+
+@router.post("/tts/stream")
+async def tts_stream(
+    text: str = Form(...),
+    authorization: str = Header(default=None),
+):
+    """
+    Synthesize text sentence by sentence for early playback.
+
+    Streams NDJSON lines: {"index": int, "audio_url": str}, one per sentence,
+    each sent as soon as that sentence's audio is ready.
+    """
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Authorization header required")
+
+    try:
+        get_user_id_from_token(authorization)
+    except Exception as auth_err:
+        logger.warning(f"Auth failed: {auth_err}")
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    if not tts_service.enabled:
+        raise HTTPException(status_code=503, detail="TTS is not enabled")
+
+    text = text.strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="Thiếu 'text'")
+    if len(text) > settings.TTS_MAX_CHARS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Text quá dài (max {settings.TTS_MAX_CHARS} ký tự)",
+        )
+
+    def generate():
+        try:
+            for index, audio_url in enumerate(tts_service.synthesize_chunks(text)):
+                yield json.dumps({"index": index, "audio_url": audio_url}) + "\n"
+        except Exception as e:
+            logger.error(f"TTS stream error: {e}", exc_info=True)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 
 @router.get("/emotion-stats")
 async def get_emotion_stats(
@@ -166,4 +295,21 @@ async def get_emotion_stats(
         raise
     except Exception as e:
         logger.error(f"Emotion stats endpoint error: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/storage-stats")
+async def get_storage_stats(authorization: str = Header(default=None)):
+    """
+    Get disk usage and file-count metrics for stored audio.
+    """
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Authorization header required")
+
+    try:
+        get_user_id_from_token(authorization)
+    except Exception as auth_err:
+        logger.warning(f"Auth failed: {auth_err}")
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    return storage_service.get_stats()
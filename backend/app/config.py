@@ -29,9 +29,27 @@ class Settings:
     LLM_MAX_TOKENS: int = 500
 
     # Audio config
-    AUDIO_DIR: str = "audio"
+    AUDIO_DIR: str = os.getenv("AUDIO_DIR", "audio")
     MAX_AUDIO_SIZE: int = 25 * 1024 * 1024  # 25MB
+    MAX_AUDIO_DURATION_SECONDS: float = float(os.getenv("MAX_AUDIO_DURATION_SECONDS", "120"))
     AUDIO_CLEANUP_HOURS: int = 24
+    AUDIO_CLEANUP_INTERVAL_SECONDS: int = int(os.getenv("AUDIO_CLEANUP_INTERVAL_SECONDS", "300"))
+    AUDIO_CLEANUP_BATCH_SIZE: int = 200
+    AUDIO_CLEANUP_BATCH_PAUSE_SECONDS: float = 0.1
+    # Kept outside AUDIO_DIR so it is not served by the /audio static mount
+    AUDIO_INDEX_PATH: str = os.getenv("AUDIO_INDEX_PATH", "audio_index.sqlite3")
+
+    # TTS config (local Piper voice, e.g. vi_VN-vais1000-medium.onnx)
+    TTS_ENABLED: bool = os.getenv("TTS_ENABLED", "true").lower() == "true"
+    TTS_VOICE_PATH: str = os.getenv("TTS_VOICE_PATH", "")
+    TTS_MAX_CHARS: int = int(os.getenv("TTS_MAX_CHARS", "2000"))
+
+    # Cache config
+    EMOTION_CACHE_MAX_ENTRIES: int = int(os.getenv("EMOTION_CACHE_MAX_ENTRIES", "1024"))
+    EMOTION_CACHE_MAX_BYTES: int = int(os.getenv("EMOTION_CACHE_MAX_BYTES", str(1024 * 1024)))  # 1MB
+    IDEMPOTENCY_CACHE_MAX_ENTRIES: int = int(os.getenv("IDEMPOTENCY_CACHE_MAX_ENTRIES", "1024"))
+    IDEMPOTENCY_CACHE_MAX_BYTES: int = int(os.getenv("IDEMPOTENCY_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))  # 4MB
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600"))
 
     # API Keys
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
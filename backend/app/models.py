@@ -12,6 +12,7 @@ class ChatResponse(BaseModel):
     reply_text: str
     emotion: str
     confidence: Optional[float] = None
+    audio_urls: list[str] = []  # TTS of reply_text, one MP3 per sentence
 
 
 class HealthResponse(BaseModel):
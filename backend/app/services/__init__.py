@@ -1,13 +1,23 @@
 """
 Services package.
+
+Singletons are imported on first access, so importing one service module
+(e.g. from a CLI) does not build every other service.
 """
 
-from app.services.emotion import emotion_service
-from app.services.chatbot import chatbot_service
-from app.services.storage import storage_service
+import importlib
+
+_SERVICE_MODULES = {
+    "emotion_service": "app.services.emotion",
+    "chatbot_service": "app.services.chatbot",
+    "storage_service": "app.services.storage",
+    "tts_service": "app.services.tts",
+}
+
+__all__ = list(_SERVICE_MODULES)
+
 
-__all__ = [
-    "emotion_service",
-    "chatbot_service",
-    "storage_service",
-]
+def __getattr__(name: str):
+    if name in _SERVICE_MODULES:
+        return getattr(importlib.import_module(_SERVICE_MODULES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
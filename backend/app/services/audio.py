@@ -0,0 +1,190 @@
+"""
+Streaming validation of uploaded WAV audio.
+
+Starlette spools the multipart body to a temporary file before the route
+runs, so the checks here cannot reject input before it is buffered; the
+body-size middleware in main.py is what cuts off oversize uploads while
+they stream in. What this module guarantees is that the spooled file is
+never read into memory whole: the header, size and duration are checked
+chunk by chunk before anything is decoded.
+"""
+
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from fastapi import UploadFile
+
+from app.services.cache import content_hasher
+
+# RIFF/WAVE format codes accepted as PCM
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# Whisper's feature extractor only accepts 16kHz; checking it up front also
+# bounds the decode buffer at MAX_AUDIO_DURATION_SECONDS x 16kHz x 2 channels
+REQUIRED_SAMPLE_RATE = 16000
+MAX_CHANNELS = 2
+
+UPLOAD_CHUNK_SIZE = 64 * 1024  # 64KB
+MAX_WAV_HEADER_SIZE = 64 * 1024  # LIST/JUNK chunks before "data" must fit in here
+
+
+class AudioValidationError(ValueError):
+    """Raised when an uploaded file is not acceptable WAV audio."""
+
+
+class WavHeaderIncomplete(AudioValidationError):
+    """Raised when more bytes are needed to reach the data chunk."""
+
+
+@dataclass
+class WavInfo:
+    """Format information parsed from a WAV header."""
+    format_code: int
+    channels: int
+    sample_rate: int
+    bits_per_sample: int
+    block_align: int
+    data_offset: int
+    data_size: int | None
+
+    @property
+    def byte_rate(self) -> int:
+        return self.sample_rate * self.block_align
+
+    @property
+    def duration(self) -> float | None:
+        """Duration in seconds declared by the header, if the data size is known."""
+        if self.data_size is None:
+            return None
+        return self.data_size / self.byte_rate
+
+
+@dataclass
+class AudioUpload:
+    """A validated upload ready for decoding, backed by the request's spooled file."""
+    file: BinaryIO
+    size: int
+    digest: str
+    info: WavInfo
+
+
+def parse_wav_header(header: bytes) -> WavInfo:
+    """
+    Parse the RIFF/WAVE header and reject anything that is not 16kHz PCM audio.
+
+    Raises WavHeaderIncomplete if `header` ends before the data chunk starts.
+    """
+    if len(header) < 12:
+        raise WavHeaderIncomplete("Truncated WAV header")
+    if header[0:4] != b"RIFF" or header[8:12] != b"WAVE":
+        raise AudioValidationError("Not a RIFF/WAVE file")
+
+    fmt = None
+    offset = 12
+    while True:
+        if offset + 8 > len(header):
+            raise WavHeaderIncomplete("Missing data chunk in WAV header")
+
+        chunk_id = header[offset:offset + 4]
+        chunk_size = struct.unpack_from("<I", header, offset + 4)[0]
+        body = offset + 8
+
+        if chunk_id == b"data":
+            break
+
+        if chunk_id == b"fmt ":
+            if chunk_size < 16:
+                raise AudioValidationError("Truncated fmt chunk")
+            if body + chunk_size > len(header):
+                raise WavHeaderIncomplete("Truncated fmt chunk")
+            fmt = struct.unpack_from("<HHIIHH", header, body)
+            if fmt[0] == WAVE_FORMAT_EXTENSIBLE:
+                if chunk_size < 26:
+                    raise AudioValidationError("Truncated extensible fmt chunk")
+                # First two bytes of the SubFormat GUID hold the real format code
+                sub_format = struct.unpack_from("<H", header, body + 24)[0]
+                fmt = (sub_format,) + fmt[1:]
+
+        # Chunks are word-aligned
+        offset = body + chunk_size + (chunk_size & 1)
+
+    if fmt is None:
+        raise AudioValidationError("Missing fmt chunk in WAV header")
+
+    format_code, channels, sample_rate, _, block_align, bits_per_sample = fmt
+    if format_code not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+        raise AudioValidationError(f"Unsupported WAV encoding (format {format_code:#06x})")
+    if sample_rate != REQUIRED_SAMPLE_RATE:
+        raise AudioValidationError(f"Sample rate must be {REQUIRED_SAMPLE_RATE}Hz, got {sample_rate}Hz")
+    if not 1 <= channels <= MAX_CHANNELS:
+        raise AudioValidationError(f"Unsupported channel count ({channels}, max {MAX_CHANNELS})")
+    if block_align < 1:
+        raise AudioValidationError("Invalid WAV format parameters")
+
+    return WavInfo(
+        format_code=format_code,
+        channels=channels,
+        sample_rate=sample_rate,
+        bits_per_sample=bits_per_sample,
+        block_align=block_align,
+        data_offset=body,
+        # Streaming writers leave the size as 0 or 0xFFFFFFFF
+        data_size=chunk_size if chunk_size not in (0, 0xFFFFFFFF) else None,
+    )
+
+
+async def read_wav_upload(file: UploadFile, max_bytes: int, max_duration: float) -> AudioUpload:
+    """
+    Validate a spooled WAV upload chunk by chunk without loading it into memory.
+
+    Header chunks are read until the data chunk is found (up to
+    MAX_WAV_HEADER_SIZE); size and duration limits are enforced as the rest
+    is read. The content hash is computed along the way and the spooled
+    file is rewound for decoding.
+    """
+    hasher = content_hasher()
+    size = 0
+    header = b""
+    info = None
+    max_data_bytes = None
+
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+
+        size += len(chunk)
+        if size > max_bytes:
+            raise AudioValidationError(f"File too large (max {max_bytes} bytes)")
+        hasher.update(chunk)
+
+        if info is None:
+            header += chunk
+            try:
+                info = parse_wav_header(header)
+            except WavHeaderIncomplete:
+                if len(header) >= MAX_WAV_HEADER_SIZE:
+                    raise AudioValidationError("Missing data chunk in WAV header")
+                continue
+            header = b""
+            max_data_bytes = int(max_duration * info.byte_rate)
+            if info.duration is not None and info.duration > max_duration:
+                raise AudioValidationError(f"Audio too long (max {max_duration:.0f}s)")
+
+        if size - info.data_offset > max_data_bytes:
+            raise AudioValidationError(f"Audio too long (max {max_duration:.0f}s)")
+
+    if info is None:
+        if not header:
+            raise AudioValidationError("Audio file is empty")
+        # Re-raise as a plain validation error: no more bytes are coming
+        try:
+            parse_wav_header(header)
+        except WavHeaderIncomplete as e:
+            raise AudioValidationError(str(e))
+
+    await file.seek(0)
+    return AudioUpload(file=file.file, size=size, digest=hasher.hexdigest(), info=info)
@@ -0,0 +1,147 @@
+"""
+In-memory caches for deduplicating repeated work.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+
+def content_hasher():
+    """Return an incremental hasher matching content_hash, for streamed data."""
+    return hashlib.blake2b(digest_size=16)
+
+
+def content_hash(data: bytes) -> str:
+    """Return a fast, collision-resistant hex digest of raw bytes."""
+    hasher = content_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count, total bytes and optional TTL."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        ttl_seconds: Optional[float] = None,
+        sizeof: Callable[[Any], int] = lambda value: 1,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._sizeof = sizeof
+        self._items: "OrderedDict[str, tuple[Any, int, float]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+
+            value, size, stored_at = item
+            if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value under key, evicting least recently used entries as needed."""
+        size = self._sizeof(value)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+
+            self._items[key] = (value, size, time.monotonic())
+            self._total_bytes += size
+
+            while len(self._items) > self.max_entries or self._total_bytes > self.max_bytes:
+                oldest_key = next(iter(self._items))
+                self._remove(oldest_key)
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._items.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        """Return current cache size and hit/miss counters."""
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._items.pop(key)
+        self._total_bytes -= size
+
+
+class IdempotencyConflict(ValueError):
+    """Raised when an idempotency key is reused for a different payload."""
+
+
+class IdempotencyInProgress(RuntimeError):
+    """Raised when a request with the same idempotency key is still running."""
+
+
+class IdempotencyStore:
+    """Replay completed responses by idempotency key, guarding against reuse and races."""
+
+    def __init__(self, cache: LRUCache):
+        self.cache = cache
+        # Keys whose request is still running -> payload fingerprint
+        self._in_flight: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key: str, fingerprint: str) -> Optional[dict]:
+        """
+        Return the stored response for key, or None after marking key in flight.
+
+        Raises IdempotencyConflict if key was used with another fingerprint and
+        IdempotencyInProgress if a request with key has not completed yet.
+        """
+        with self._lock:
+            entry = self.cache.get(key)
+            known_fingerprint = entry["fingerprint"] if entry else self._in_flight.get(key)
+            if known_fingerprint is not None and known_fingerprint != fingerprint:
+                raise IdempotencyConflict("Idempotency-Key was already used for a different request")
+            if entry:
+                return entry["response"]
+            if key in self._in_flight:
+                raise IdempotencyInProgress("A request with this Idempotency-Key is still in progress")
+
+            self._in_flight[key] = fingerprint
+            return None
+
+    def complete(self, key: str, response: dict) -> None:
+        """Store the response of an in-flight key and release it."""
+        with self._lock:
+            fingerprint = self._in_flight.pop(key, None)
+            if fingerprint is not None:
+                self.cache.set(key, {"fingerprint": fingerprint, "response": response})
+
+    def release(self, key: str) -> None:
+        """Release an in-flight key without storing a response (the request failed)."""
+        with self._lock:
+            self._in_flight.pop(key, None)
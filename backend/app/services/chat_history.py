@@ -38,6 +38,39 @@ def save_message(
         raise
 
 
+# Rows per bulk_update_message_emotions call
+EMOTION_UPDATE_BATCH_SIZE = 100
+
+
+def update_message_emotions(updates: list[dict]) -> int:
+    """Bulk-set emotion and confidence on existing messages.
+
+    Args:
+        updates: List of {"id", "emotion", "confidence"} dictionaries
+
+    Returns:
+        Number of rows updated
+
+    Uses the `bulk_update_message_emotions` SQL function
+    (backend/sql/bulk_update_message_emotions.sql): only these two columns
+    are written, with UPDATE rights alone, and ids travel in the POST body
+    rather than the URL.
+    """
+    updated = 0
+    try:
+        for i in range(0, len(updates), EMOTION_UPDATE_BATCH_SIZE):
+            batch = [
+                {"id": str(u["id"]), "emotion": u["emotion"], "confidence": u["confidence"]}
+                for u in updates[i:i + EMOTION_UPDATE_BATCH_SIZE]
+            ]
+            response = supabase.rpc("bulk_update_message_emotions", {"updates": batch}).execute()
+            updated += response.data or 0
+        return updated
+    except Exception as exc:
+        logger.error("Failed to bulk update message emotions: %s", exc, exc_info=True)
+        raise
+
+
 def get_recent_messages(user_id: str, limit: int = 5) -> list[dict]:
     """Get the most recent messages for a user.
     
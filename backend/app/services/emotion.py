@@ -5,6 +5,16 @@ from transformers import WhisperModel, WhisperFeatureExtractor
 import numpy as np
 import soundfile as sf
 import io
+import sys
+import threading
+from typing import BinaryIO
+
+from app.services.cache import LRUCache, content_hash
+
+
+def _prediction_size(result: dict) -> int:
+    """Approximate memory footprint of a cached prediction."""
+    return sys.getsizeof(result) + sum(sys.getsizeof(v) for v in result.values())
 
 
 class WhisperAttentionClassifier(nn.Module):
@@ -64,21 +74,63 @@ class EmotionModel:
             "openai/whisper-tiny"
         )
 
+        # Cache kết quả theo hash nội dung audio (client retry / gửi lại cùng file)
+        self.cache = LRUCache(
+            max_entries=settings.EMOTION_CACHE_MAX_ENTRIES,
+            max_bytes=settings.EMOTION_CACHE_MAX_BYTES,
+            sizeof=_prediction_size,
+        )
+
+        # Buffer PCM dùng lại giữa các request, chỉ cấp phát lại khi audio dài hơn
+        self._pcm = np.empty(0, dtype=np.float32)
+        self._mono = np.empty(0, dtype=np.float32)
+        self._decode_lock = threading.Lock()
+
+    def _decode(self, audio: BinaryIO):
+        """Decode WAV into the reused float32 buffer; returns (mono view, sample rate)."""
+        with sf.SoundFile(audio) as f:
+            frames, channels, sr = f.frames, f.channels, f.samplerate
+
+            if self._pcm.size < frames * channels:
+                self._pcm = np.empty(frames * channels, dtype=np.float32)
+            pcm = self._pcm[: frames * channels].reshape(frames, channels)
+            frames = f.read(frames, dtype="float32", always_2d=True, out=pcm).shape[0]
+
+        if channels == 1:
+            return pcm[:frames, 0], sr
+
+        # Force mono
+        if self._mono.size < frames:
+            self._mono = np.empty(frames, dtype=np.float32)
+        mono = self._mono[:frames]
+        np.mean(pcm[:frames], axis=1, out=mono)
+        return mono, sr
+
     @torch.no_grad()
-    def predict(self, audio_bytes: bytes):
+    def predict(self, audio: bytes | BinaryIO, cache_key: str | None = None):
         """
-        audio_bytes: WAV audio bytes
+        audio: WAV audio bytes, or a seekable file object positioned at the start
+        cache_key: content hash of the audio; computed for bytes, caching is
+            skipped for file objects without one
         """
+        if cache_key is None and isinstance(audio, (bytes, bytearray)):
+            cache_key = content_hash(audio)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+
+        if isinstance(audio, (bytes, bytearray)):
+            audio = io.BytesIO(audio)
+
         try:
-            # 1. Đọc audio từ bytes
-            data, sr = sf.read(io.BytesIO(audio_bytes), dtype="float32")
+            with self._decode_lock:
+                # 1-2. Đọc audio + force mono
+                data, sr = self._decode(audio)
 
-            # 2. Force mono
-            if data.ndim > 1:
-                data = np.mean(data, axis=1)
+                # 3. Feature extraction (copies out of the shared buffer)
+                inputs = self.feature_extractor(data, sampling_rate=sr, return_tensors="pt")
 
-            # 3. Feature extraction
-            inputs = self.feature_extractor(data, sampling_rate=sr, return_tensors="pt")
             input_features = inputs.input_features.to(self.device)
 
             # 4. Predict
@@ -88,13 +140,31 @@ class EmotionModel:
             probs = torch.softmax(logits, dim=-1)[0]
             pred_id = torch.argmax(probs).item()
 
-            return {
+            result = {
                 "emotion": self.labels[pred_id],
                 "confidence": probs[pred_id].item(),
             }
         except Exception as e:
             raise RuntimeError(f"Emotion detection error: {str(e)}")
 
+        if cache_key is not None:
+            self.cache.set(cache_key, result)
+        return dict(result)
+
+    @torch.no_grad()
+    def predict_batch(self, input_features: np.ndarray) -> list[dict]:
+        """
+        input_features: log-mel features [B, 80, 3000] from WhisperFeatureExtractor
+        """
+        features = torch.from_numpy(input_features).to(self.device)
+        probs = torch.softmax(self.model(features)["logits"], dim=-1)
+        confidences, pred_ids = probs.max(dim=-1)
+
+        return [
+            {"emotion": self.labels[pred_id], "confidence": confidence}
+            for pred_id, confidence in zip(pred_ids.tolist(), confidences.tolist())
+        ]
+
 
 # Singleton instance
 emotion_service = EmotionModel()
@@ -1,8 +1,17 @@
 """
 Storage service for managing audio files.
+
+Files are sharded into subdirectories of AUDIO_DIR and every write is
+recorded in a SQLite expiry index, so cleanup only touches expired
+entries instead of walking the whole directory.
 """
 
+import asyncio
+import hashlib
 import os
+import sqlite3
+import tempfile
+import threading
 import time
 import logging
 from app.config import settings
@@ -17,34 +26,160 @@ class StorageService:
         """Initialize storage service."""
         os.makedirs(settings.AUDIO_DIR, exist_ok=True)
 
-    def cleanup_old_files(self):
-        """Delete audio files older than AUDIO_CLEANUP_HOURS."""
+        index_dir = os.path.dirname(settings.AUDIO_INDEX_PATH)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+        is_new_index = not os.path.exists(settings.AUDIO_INDEX_PATH)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(settings.AUDIO_INDEX_PATH, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS files_expires_at ON files (expires_at)")
+        self._db.commit()
+
+        if is_new_index:
+            self._index_existing_files()
+
+        count, total = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files"
+        ).fetchone()
+        self._file_count = count
+        self._total_bytes = total
+        self._deleted_count = 0
+
+    def path_for(self, filename: str) -> str:
+        """Return the sharded path of filename, relative to AUDIO_DIR."""
+        digest = hashlib.md5(filename.encode("utf-8")).hexdigest()
+        return os.path.join(digest[:2], digest[2:4], filename)
+
+    def absolute_path(self, rel_path: str) -> str:
+        """Return the filesystem path of a path relative to AUDIO_DIR."""
+        return os.path.join(settings.AUDIO_DIR, rel_path)
+
+    def save_file(self, filename: str, data: bytes) -> str:
+        """Atomically write data into its shard and index it; returns the relative path."""
+        rel_path = self.path_for(filename)
+        file_path = self.absolute_path(rel_path)
+        shard_dir = os.path.dirname(file_path)
+        os.makedirs(shard_dir, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=shard_dir, suffix=".tmp")
         try:
-            cutoff_time = time.time() - (settings.AUDIO_CLEANUP_HOURS * 3600)
-            deleted_count = 0
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, file_path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
 
-            for filename in os.listdir(settings.AUDIO_DIR):
-                file_path = os.path.join(settings.AUDIO_DIR, filename)
+        self._index(rel_path, len(data))
+        return rel_path
 
-                # Only delete .mp3 files (TTS output)
-                if not filename.endswith(".mp3"):
+    def touch(self, rel_path: str) -> bool:
+        """Extend the expiry of an indexed file; returns False if it is not stored."""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE files SET expires_at = ? WHERE path = ?",
+                (self._expires_at(), rel_path),
+            )
+            self._db.commit()
+        return cursor.rowcount > 0 and os.path.isfile(self.absolute_path(rel_path))
+
+    def cleanup_expired(self, batch_size: int | None = None) -> int:
+        """Delete one batch of expired files, oldest first; returns the number removed."""
+        batch_size = batch_size or settings.AUDIO_CLEANUP_BATCH_SIZE
+        deleted = []
+        failed = []
+
+        # Everything happens under the lock so touch() cannot revive a path
+        # between it being selected and its file being unlinked.
+        with self._lock:
+            now = time.time()
+            rows = self._db.execute(
+                "SELECT path, size FROM files WHERE expires_at < ? ORDER BY expires_at LIMIT ?",
+                (now, batch_size),
+            ).fetchall()
+
+            for rel_path, size in rows:
+                try:
+                    os.remove(self.absolute_path(rel_path))
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    logger.warning(f"Failed to delete {rel_path}: {e}")
+                    failed.append(rel_path)
                     continue
 
-                if os.path.isfile(file_path):
-                    file_time = os.path.getmtime(file_path)
-                    if file_time < cutoff_time:
-                        try:
-                            os.remove(file_path)
-                            deleted_count += 1
-                            logger.info(f"Deleted old audio file: {filename}")
-                        except Exception as e:
-                            logger.warning(f"Failed to delete {filename}: {e}")
+                cursor = self._db.execute(
+                    "DELETE FROM files WHERE path = ? AND expires_at < ?", (rel_path, now)
+                )
+                if cursor.rowcount:
+                    deleted.append(size)
+
+            # Keep rows whose file could not be removed, retry them next pass
+            self._db.executemany(
+                "UPDATE files SET expires_at = ? WHERE path = ?",
+                [(now + settings.AUDIO_CLEANUP_INTERVAL_SECONDS, p) for p in failed],
+            )
+            self._db.commit()
+
+            self._file_count -= len(deleted)
+            self._total_bytes -= sum(deleted)
+            self._deleted_count += len(deleted)
+
+        return len(deleted)
+
+    def cleanup_old_files(self):
+        """Delete all audio files older than AUDIO_CLEANUP_HOURS."""
+        try:
+            deleted_count = 0
+            while True:
+                deleted = self.cleanup_expired()
+                if not deleted:
+                    break
+                deleted_count += deleted
 
             logger.info(f"Cleanup completed: {deleted_count} files deleted")
 
         except Exception as e:
             logger.error(f"Storage cleanup error: {e}")
 
+    async def run_cleanup_loop(self):
+        """Background task: delete expired files in small batches, forever."""
+        while True:
+            try:
+                deleted_count = 0
+                while True:
+                    deleted = await asyncio.to_thread(self.cleanup_expired)
+                    if not deleted:
+                        break
+                    deleted_count += deleted
+                    # Yield between batches so cleanup never hogs the disk
+                    await asyncio.sleep(settings.AUDIO_CLEANUP_BATCH_PAUSE_SECONDS)
+
+                if deleted_count:
+                    logger.info(f"Cleanup completed: {deleted_count} files deleted")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Storage cleanup error: {e}")
+
+            await asyncio.sleep(settings.AUDIO_CLEANUP_INTERVAL_SECONDS)
+
+    def get_stats(self) -> dict:
+        """Return disk usage and file-count metrics for stored audio."""
+        with self._lock:
+            next_expiry = self._db.execute("SELECT MIN(expires_at) FROM files").fetchone()[0]
+            return {
+                "file_count": self._file_count,
+                "total_bytes": self._total_bytes,
+                "deleted_count": self._deleted_count,
+                "next_expiry": next_expiry,
+            }
+
     def get_file_size(self, file_path: str) -> int:
         """Get file size in bytes."""
         try:
@@ -53,6 +188,48 @@ class StorageService:
             logger.warning(f"Failed to get file size for {file_path}: {e}")
             return 0
 
+    def _expires_at(self, start: float | None = None) -> float:
+        return (start if start is not None else time.time()) + settings.AUDIO_CLEANUP_HOURS * 3600
+
+    def _index(self, rel_path: str, size: int):
+        with self._lock:
+            previous = self._db.execute(
+                "SELECT size FROM files WHERE path = ?", (rel_path,)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (path, size, expires_at) VALUES (?, ?, ?)",
+                (rel_path, size, self._expires_at()),
+            )
+            self._db.commit()
+
+            if previous:
+                self._total_bytes += size - previous[0]
+            else:
+                self._file_count += 1
+                self._total_bytes += size
+
+    def _index_existing_files(self):
+        """One-time import of files written before the index existed."""
+        rows = []
+        for root, _, filenames in os.walk(settings.AUDIO_DIR):
+            for filename in filenames:
+                # Only manage .mp3 files (TTS output)
+                if not filename.endswith(".mp3"):
+                    continue
+                file_path = os.path.join(root, filename)
+                stat = os.stat(file_path)
+                rel_path = os.path.relpath(file_path, settings.AUDIO_DIR)
+                rows.append((rel_path, stat.st_size, self._expires_at(stat.st_mtime)))
+
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO files (path, size, expires_at) VALUES (?, ?, ?)", rows
+            )
+            self._db.commit()
+
+        if rows:
+            logger.info(f"Indexed {len(rows)} existing audio files")
+
 
 # Singleton instance
 storage_service = StorageService()
@@ -0,0 +1,94 @@
+"""
+Text-to-speech service using a local Piper voice on CPU.
+
+Output is one MP3 per sentence, stored through StorageService under
+content-addressed names, so a sentence that was already synthesized is
+served from the cached file instead of being synthesized again.
+"""
+
+import io
+import logging
+import re
+from typing import Iterator
+
+import numpy as np
+import soundfile as sf
+
+from app.config import settings
+from app.services.cache import content_hash
+from app.services.storage import storage_service
+
+logger = logging.getLogger(__name__)
+
+# Split after sentence punctuation or on line breaks
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+def split_sentences(text: str) -> list[str]:
+    """Split text into sentences for chunked synthesis."""
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s.strip()]
+
+
+class TTSService:
+    """Service for synthesizing replies to cached audio files."""
+
+    def __init__(self):
+        """Load the Piper voice if TTS is enabled and configured."""
+        self.voice = None
+
+        if not settings.TTS_ENABLED or not settings.TTS_VOICE_PATH:
+            logger.info("TTS disabled (set TTS_ENABLED and TTS_VOICE_PATH to enable)")
+            return
+
+        try:
+            from piper import PiperVoice
+
+            self.voice = PiperVoice.load(settings.TTS_VOICE_PATH)
+            logger.info(f"Loaded TTS voice: {settings.TTS_VOICE_PATH}")
+        except Exception as e:
+            logger.error(f"Failed to load TTS voice, TTS disabled: {e}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.voice is not None
+
+    def synthesize(self, text: str) -> list[str]:
+        """Synthesize text and return the /audio URLs of its sentences, in playback order."""
+        return list(self.synthesize_chunks(text))
+
+    def synthesize_chunks(self, text: str) -> Iterator[str]:
+        """Synthesize text sentence by sentence, yielding each MP3 URL as soon as it is ready."""
+        if not self.enabled:
+            return
+
+        # Sentences are the unit of caching, so /chat and /tts/stream share files
+        for sentence in split_sentences(text):
+            yield self._cached_audio(sentence)
+
+    def _cached_audio(self, text: str) -> str:
+        key = f"{settings.TTS_VOICE_PATH}\n{text}".encode("utf-8")
+        filename = f"{content_hash(key)}.mp3"
+        rel_path = storage_service.path_for(filename)
+
+        # Reuse previous output; touching also pushes back its expiry
+        if not storage_service.touch(rel_path):
+            audio, sample_rate = self._synthesize_pcm(text)
+            buffer = io.BytesIO()
+            sf.write(buffer, audio, sample_rate, format="MP3")
+            storage_service.save_file(filename, buffer.getvalue())
+
+        return "/audio/" + rel_path.replace("\\", "/")
+
+    def _synthesize_pcm(self, text: str) -> tuple[np.ndarray, int]:
+        pieces = []
+        sample_rate = self.voice.config.sample_rate
+        for chunk in self.voice.synthesize(text):
+            pieces.append(chunk.audio_float_array)
+            sample_rate = chunk.sample_rate
+
+        audio = np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+        return audio, sample_rate
+
+
+# Singleton instance
+tts_service = TTSService()
@@ -2,13 +2,16 @@
 Main entry point for the FastAPI application.
 """
 
+import asyncio
 import logging
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from app.config import settings
 from app.api import router
+from app.services import storage_service
 
 # Configure logging
 logging.basicConfig(
@@ -33,6 +36,72 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Multipart framing + form fields allowance on top of the audio limit
+MAX_REQUEST_BODY_SIZE = settings.MAX_AUDIO_SIZE + 64 * 1024
+BODY_TOO_LARGE_DETAIL = f"File quá lớn (max {settings.MAX_AUDIO_SIZE / (1024*1024):.0f}MB)"
+
+
+class RequestBodyTooLarge(HTTPException):
+    """Raised from receive() once the streamed body exceeds the limit."""
+
+    def __init__(self):
+        super().__init__(status_code=413, detail=BODY_TOO_LARGE_DETAIL)
+
+
+class BodySizeLimitMiddleware:
+    """
+    Enforce MAX_REQUEST_BODY_SIZE while the body streams in.
+
+    Content-Length is checked up front; chunked bodies are counted as they
+    are received, so an oversize upload is cut off before it is spooled.
+    """
+
+    def __init__(self, app, max_body_size: int):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_body_size:
+                return await self._reject(scope, receive, send)
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise RequestBodyTooLarge()
+            return message
+
+        async def tracked_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except RequestBodyTooLarge:
+            # Normally turned into a 413 by FastAPI's exception handling already
+            if response_started:
+                raise
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse(status_code=413, content={"detail": BODY_TOO_LARGE_DETAIL})
+        await response(scope, receive, send)
+
+
+app.add_middleware(BodySizeLimitMiddleware, max_body_size=MAX_REQUEST_BODY_SIZE)
+
+
 # Mount static audio directory
 app.mount("/audio", StaticFiles(directory=settings.AUDIO_DIR), name="audio")
 
@@ -56,12 +125,14 @@ async def startup_event():
     """Run on app startup."""
     logger.info("Starting Therapist Chat API...")
     logger.info(f"Using device: {settings.EMOTION_MODEL_PATH}")
+    app.state.cleanup_task = asyncio.create_task(storage_service.run_cleanup_loop())
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Run on app shutdown."""
     logger.info("Shutting down Therapist Chat API...")
+    app.state.cleanup_task.cancel()
 
 
 if __name__ == "__main__":
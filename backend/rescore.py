@@ -0,0 +1,253 @@
+"""
+Offline re-scoring of stored audio with the current emotion model.
+
+Streams WAV files through EmotionModel in batches and backfills the
+`emotion` / `confidence` columns of the messages table. Each WAV maps to
+a message id: the file stem for a directory, or the `message_id` column of
+a CSV manifest (`path,message_id`).
+
+Writing to Supabase requires the SQL function in
+sql/bulk_update_message_emotions.sql.
+
+Usage:
+    python rescore.py audio_dir/ --checkpoint rescore.ckpt.json
+    python rescore.py manifest.csv --sqlite local.db   # local Supabase stand-in
+"""
+
+import argparse
+import csv
+import json
+import logging
+import multiprocessing as mp
+import os
+import sqlite3
+import time
+from collections import deque
+
+import numpy as np
+import soundfile as sf
+
+logger = logging.getLogger("rescore")
+
+# Per-process feature extractor, created in _init_worker
+_feature_extractor = None
+
+
+def _init_worker():
+    global _feature_extractor
+    from transformers import WhisperFeatureExtractor
+
+    _feature_extractor = WhisperFeatureExtractor.from_pretrained("openai/whisper-tiny")
+
+
+def _load_features(path: str) -> np.ndarray | None:
+    """Decode one WAV into Whisper log-mel features; None if it cannot be read."""
+    try:
+        data, sr = sf.read(path, dtype="float32")
+        if data.ndim > 1:
+            data = np.mean(data, axis=1)
+        inputs = _feature_extractor(data, sampling_rate=sr, return_tensors="np")
+        return inputs.input_features[0]
+    except Exception as e:
+        logger.warning(f"Skipping {path}: {e}")
+        return None
+
+
+def iter_items(source: str) -> list[tuple[str, str]]:
+    """Return (wav_path, message_id) pairs in a stable order."""
+    if os.path.isdir(source):
+        items = []
+        for root, _, filenames in os.walk(source):
+            for filename in filenames:
+                if filename.lower().endswith(".wav"):
+                    items.append((os.path.join(root, filename), os.path.splitext(filename)[0]))
+        return sorted(items)
+
+    base_dir = os.path.dirname(source)
+    with open(source, newline="", encoding="utf-8") as f:
+        return [
+            (os.path.join(base_dir, row["path"]), row["message_id"])
+            for row in csv.DictReader(f)
+        ]
+
+
+def iter_prefetched(load_batch, items: list, batch_size: int, prefetch: int):
+    """Yield (batch_items, features) with up to `prefetch` batches decoding ahead.
+
+    `load_batch(paths)` must return an AsyncResult (e.g. Pool.map_async).
+    """
+    pending = deque()
+    batches = (items[i:i + batch_size] for i in range(0, len(items), batch_size))
+
+    for batch in batches:
+        pending.append((batch, load_batch([path for path, _ in batch])))
+        if len(pending) > prefetch:
+            batch, result = pending.popleft()
+            yield batch, result.get()
+
+    while pending:
+        batch, result = pending.popleft()
+        yield batch, result.get()
+
+
+class SQLiteMessageStore:
+    """Local stand-in for the Supabase messages table."""
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "id TEXT PRIMARY KEY, user_id TEXT, role TEXT, content TEXT, "
+            "emotion TEXT, confidence REAL, created_at TEXT)"
+        )
+        self.db.commit()
+
+    def update_message_emotions(self, updates: list[dict]):
+        with self.db:
+            self.db.executemany(
+                "UPDATE messages SET emotion = :emotion, confidence = :confidence WHERE id = :id",
+                updates,
+            )
+
+
+class SupabaseMessageStore:
+    """Writes to the configured Supabase project."""
+
+    def update_message_emotions(self, updates: list[dict]):
+        from app.services.chat_history import update_message_emotions
+
+        update_message_emotions(updates)
+
+
+def load_checkpoint(path: str | None, source: str, items: list[tuple[str, str]]) -> int:
+    """Return how many items a previous run finished; refuse checkpoints from another input."""
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+
+    processed = state["processed"]
+    if state["source"] != os.path.abspath(source):
+        raise RuntimeError(
+            f"Checkpoint {path} was written for {state['source']}, not {os.path.abspath(source)}"
+        )
+    if processed and (processed > len(items) or items[processed - 1][1] != state["last_message_id"]):
+        raise RuntimeError(
+            f"Checkpoint {path} does not match {source} (files added or removed since); "
+            "delete it to start over"
+        )
+    return processed
+
+
+def save_checkpoint(path: str | None, source: str, items: list[tuple[str, str]], processed: int):
+    if not path:
+        return
+    state = {
+        "source": os.path.abspath(source),
+        "processed": processed,
+        "last_message_id": items[processed - 1][1] if processed else None,
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def rescore(
+    source: str,
+    model,
+    store,
+    batch_size: int = 64,
+    write_chunk_size: int = 500,
+    workers: int = 4,
+    prefetch: int = 4,
+    checkpoint: str | None = None,
+    load_features=_load_features,
+    initializer=_init_worker,
+) -> int:
+    """
+    Score every WAV in `source` and bulk-write results; resumes from and updates `checkpoint`.
+
+    `load_features(path)` runs in the worker pool after `initializer()`; both
+    must be importable module-level functions (spawn pickles them by name).
+    """
+    items = iter_items(source)
+    processed = load_checkpoint(checkpoint, source, items)
+    if processed:
+        logger.info(f"Resuming from checkpoint: {processed} items already done")
+
+    pending_updates = []
+    started = time.perf_counter()
+    scored = 0
+
+    def flush():
+        # Checkpoint only after the write lands so a crash re-scores, never skips
+        store.update_message_emotions(pending_updates)
+        save_checkpoint(checkpoint, source, items, processed)
+        pending_updates.clear()
+
+    def load_batch(paths):
+        return pool.map_async(load_features, paths)
+
+    # spawn: the model is loaded in this process, forking torch state is unsafe
+    with mp.get_context("spawn").Pool(workers, initializer=initializer) as pool:
+        for batch, features in iter_prefetched(load_batch, items[processed:], batch_size, prefetch):
+            readable = [(item, f) for item, f in zip(batch, features) if f is not None]
+            if readable:
+                results = model.predict_batch(np.stack([f for _, f in readable]))
+                for ((_, message_id), _), result in zip(readable, results):
+                    pending_updates.append({"id": message_id, **result})
+
+            processed += len(batch)
+            scored += len(batch)
+            if len(pending_updates) >= write_chunk_size:
+                flush()
+
+            elapsed = time.perf_counter() - started
+            logger.info(f"{processed}/{len(items)} items, {scored / elapsed:.1f} items/sec")
+
+    flush()
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score stored audio with the emotion model.")
+    parser.add_argument("source", help="Directory of WAV files or CSV manifest (path,message_id)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--write-chunk-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--prefetch", type=int, default=4, help="Batches decoded ahead of the model")
+    parser.add_argument("--checkpoint", help="JSON file to resume from and record progress in")
+    parser.add_argument("--sqlite", help="Write to a local SQLite messages table instead of Supabase")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    # Only the emotion module: no storage, TTS or LLM singletons for a batch job
+    from app.services.emotion import emotion_service
+
+    store = SQLiteMessageStore(args.sqlite) if args.sqlite else SupabaseMessageStore()
+
+    started = time.perf_counter()
+    try:
+        processed = rescore(
+            args.source,
+            emotion_service,
+            store,
+            batch_size=args.batch_size,
+            write_chunk_size=args.write_chunk_size,
+            workers=args.workers,
+            prefetch=args.prefetch,
+            checkpoint=args.checkpoint,
+        )
+    except RuntimeError as e:
+        parser.exit(1, f"rescore: {e}\n")
+    elapsed = time.perf_counter() - started
+    logger.info(f"Done: {processed} items in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+-- Bulk-set emotion/confidence on existing messages in one statement.
+-- Used by rescore.py via app.services.chat_history.update_message_emotions.
+-- updates: [{"id": "...", "emotion": "happy", "confidence": 0.93}, ...]
+-- Runs with the caller's rights (UPDATE on messages); returns rows updated.
+
+create or replace function public.bulk_update_message_emotions(updates jsonb)
+returns integer
+language sql
+security invoker
+as $$
+  with u as (
+    select
+      x ->> 'id' as id,
+      x ->> 'emotion' as emotion,
+      (x ->> 'confidence')::double precision as confidence
+    from jsonb_array_elements(updates) as x
+  ),
+  updated as (
+    update public.messages as m
+    set emotion = u.emotion,
+        confidence = u.confidence
+    from u
+    where m.id::text = u.id
+    returning 1
+  )
+  select count(*)::integer from updated;
+$$;
@@ -0,0 +1,10 @@
+"""
+Shared test setup: keep service singletons out of the working directory.
+"""
+
+import os
+import tempfile
+
+_tmp_dir = tempfile.mkdtemp(prefix="thera-tests-")
+os.environ.setdefault("AUDIO_DIR", os.path.join(_tmp_dir, "audio"))
+os.environ.setdefault("AUDIO_INDEX_PATH", os.path.join(_tmp_dir, "audio_index.sqlite3"))
@@ -0,0 +1,142 @@
+"""
+Tests for streaming WAV upload validation.
+"""
+
+import asyncio
+import io
+import struct
+
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi import UploadFile
+
+from app.services.audio import (
+    MAX_WAV_HEADER_SIZE,
+    WAVE_FORMAT_EXTENSIBLE,
+    WAVE_FORMAT_PCM,
+    AudioValidationError,
+    WavHeaderIncomplete,
+    parse_wav_header,
+    read_wav_upload,
+)
+
+
+def _chunk(chunk_id: bytes, body: bytes) -> bytes:
+    return chunk_id + struct.pack("<I", len(body)) + body + (b"\0" if len(body) & 1 else b"")
+
+
+def _wav(
+    format_code=WAVE_FORMAT_PCM,
+    channels=1,
+    sample_rate=16000,
+    bits=16,
+    data=b"\0\0" * 160,
+    data_size=None,
+    extra_chunks=b"",
+    sub_format=None,
+) -> bytes:
+    block_align = channels * bits // 8
+    fmt = struct.pack(
+        "<HHIIHH", format_code, channels, sample_rate, sample_rate * block_align, block_align, bits
+    )
+    if sub_format is not None:
+        # cbSize, valid bits, channel mask, SubFormat GUID (format code first)
+        fmt += struct.pack("<HHI", 22, bits, 0) + struct.pack("<H", sub_format) + b"\0" * 14
+    size = len(data) if data_size is None else data_size
+    body = b"WAVE" + _chunk(b"fmt ", fmt) + extra_chunks + b"data" + struct.pack("<I", size) + data
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def test_parse_pcm_header():
+    info = parse_wav_header(_wav())
+
+    assert (info.format_code, info.channels, info.sample_rate, info.bits_per_sample) == (1, 1, 16000, 16)
+    assert info.data_offset == 44
+    assert info.data_size == 320
+    assert info.duration == pytest.approx(0.01)
+
+
+def test_parse_extensible_header_uses_sub_format():
+    info = parse_wav_header(_wav(format_code=WAVE_FORMAT_EXTENSIBLE, sub_format=WAVE_FORMAT_PCM))
+    assert info.format_code == WAVE_FORMAT_PCM
+
+
+@pytest.mark.parametrize("data_size", [0, 0xFFFFFFFF])
+def test_parse_streaming_data_size_is_unknown(data_size):
+    info = parse_wav_header(_wav(data_size=data_size))
+    assert info.data_size is None
+    assert info.duration is None
+
+
+def test_parse_skips_metadata_chunks_before_data():
+    header = _wav(extra_chunks=_chunk(b"LIST", b"x" * 5000))
+    assert parse_wav_header(header).data_offset == 44 + 8 + 5000
+
+
+@pytest.mark.parametrize(
+    "header, message",
+    [
+        (b"RIFX" + b"\0" * 40, "Not a RIFF/WAVE file"),
+        (_wav(format_code=0x0002), "Unsupported WAV encoding"),
+        (_wav(format_code=WAVE_FORMAT_EXTENSIBLE, sub_format=0x0055), "Unsupported WAV encoding"),
+        (_wav(sample_rate=44100), "Sample rate must be 16000Hz"),
+        (_wav(channels=6), "Unsupported channel count"),
+    ],
+)
+def test_parse_rejects_unsupported_input(header, message):
+    with pytest.raises(AudioValidationError, match=message):
+        parse_wav_header(header)
+
+
+def test_parse_reports_incomplete_header():
+    header = _wav(extra_chunks=_chunk(b"LIST", b"x" * 5000))
+    with pytest.raises(WavHeaderIncomplete):
+        parse_wav_header(header[:4096])
+
+
+def _read(data: bytes, max_bytes=1024 * 1024, max_duration=10.0):
+    upload = UploadFile(file=io.BytesIO(data))
+    return asyncio.run(read_wav_upload(upload, max_bytes=max_bytes, max_duration=max_duration))
+
+
+def _real_wav(seconds: float) -> bytes:
+    buffer = io.BytesIO()
+    sf.write(buffer, np.zeros(int(16000 * seconds), dtype=np.float32), 16000, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def test_read_upload_hashes_and_rewinds():
+    data = _real_wav(0.5)
+    upload = _read(data)
+
+    assert upload.size == len(data)
+    assert upload.info.sample_rate == 16000
+    assert upload.file.read() == data
+
+
+def test_read_upload_finds_data_chunk_after_large_metadata():
+    data = _wav(extra_chunks=_chunk(b"LIST", b"x" * (MAX_WAV_HEADER_SIZE // 2)))
+    assert _read(data).info.data_offset > MAX_WAV_HEADER_SIZE // 2
+
+
+def test_read_upload_rejects_header_without_data_chunk():
+    with pytest.raises(AudioValidationError, match="Missing data chunk"):
+        _read(_wav(extra_chunks=_chunk(b"LIST", b"x" * (MAX_WAV_HEADER_SIZE * 2))))
+
+
+def test_read_upload_enforces_size_and_duration():
+    data = _real_wav(2.0)
+    with pytest.raises(AudioValidationError, match="too large"):
+        _read(data, max_bytes=len(data) - 1)
+    with pytest.raises(AudioValidationError, match="too long"):
+        _read(data, max_duration=1.0)
+    # Streaming header (unknown size): limit enforced on bytes actually read
+    streamed = _wav(data_size=0, data=b"\0\0" * 16000 * 2)
+    with pytest.raises(AudioValidationError, match="too long"):
+        _read(streamed, max_duration=1.0)
+
+
+def test_read_upload_rejects_empty_file():
+    with pytest.raises(AudioValidationError, match="empty"):
+        _read(b"")
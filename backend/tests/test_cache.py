@@ -0,0 +1,108 @@
+"""
+Tests for the LRU cache and idempotency store.
+"""
+
+import pytest
+
+from app.services import cache as cache_module
+from app.services.cache import (
+    IdempotencyConflict,
+    IdempotencyInProgress,
+    IdempotencyStore,
+    LRUCache,
+    content_hash,
+    content_hasher,
+)
+
+
+def test_content_hasher_matches_content_hash():
+    hasher = content_hasher()
+    hasher.update(b"ab")
+    hasher.update(b"cd")
+    assert hasher.hexdigest() == content_hash(b"abcd")
+
+
+def test_lru_evicts_least_recently_used_by_entry_count():
+    cache = LRUCache(max_entries=2, max_bytes=100)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_lru_evicts_by_total_bytes_and_skips_oversized_values():
+    cache = LRUCache(max_entries=10, max_bytes=10, sizeof=len)
+    cache.set("a", "xxxx")
+    cache.set("b", "yyyy")
+    cache.set("c", "zzzz")  # 12 bytes > 10: evicts "a"
+
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 8
+
+    cache.set("big", "x" * 11)
+    assert cache.get("big") is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_lru_replacing_a_key_updates_byte_total():
+    cache = LRUCache(max_entries=10, max_bytes=100, sizeof=len)
+    cache.set("a", "xxxx")
+    cache.set("a", "xx")
+    assert cache.stats()["bytes"] == 2
+    assert cache.stats()["entries"] == 1
+
+
+def test_lru_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = LRUCache(max_entries=10, max_bytes=100, ttl_seconds=60)
+    cache.set("a", 1)
+
+    now[0] += 59
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def _idempotency_store():
+    return IdempotencyStore(LRUCache(max_entries=10, max_bytes=10_000, ttl_seconds=600))
+
+
+def test_idempotency_replays_completed_response():
+    store = _idempotency_store()
+    assert store.begin("k", "fp") is None
+    store.complete("k", {"reply_text": "hi"})
+
+    assert store.begin("k", "fp") == {"reply_text": "hi"}
+
+
+def test_idempotency_rejects_key_reused_for_different_payload():
+    store = _idempotency_store()
+    store.begin("k", "fp")
+    store.complete("k", {"reply_text": "hi"})
+
+    with pytest.raises(IdempotencyConflict):
+        store.begin("k", "other-fp")
+
+
+def test_idempotency_concurrent_retry_is_in_progress_or_conflict():
+    store = _idempotency_store()
+    store.begin("k", "fp")
+
+    with pytest.raises(IdempotencyInProgress):
+        store.begin("k", "fp")
+    with pytest.raises(IdempotencyConflict):
+        store.begin("k", "other-fp")
+
+
+def test_idempotency_release_allows_retry_after_failure():
+    store = _idempotency_store()
+    store.begin("k", "fp")
+    store.release("k")
+
+    assert store.begin("k", "fp") is None
@@ -0,0 +1,137 @@
+"""
+Tests for the rescore CLI, run against the local SQLite stand-in for Supabase.
+"""
+
+import json
+import sqlite3
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import rescore
+
+MESSAGE_IDS = [f"msg-{i:02d}" for i in range(6)]
+
+
+# Worker functions must be module-level: the spawn pool pickles them by name
+def _init_stub_worker():
+    pass
+
+
+def _load_stub_features(path: str) -> np.ndarray:
+    data, _ = sf.read(path, dtype="float32")
+    return np.array([data.mean()], dtype=np.float32)
+
+
+class StubModel:
+    """Stands in for EmotionModel: positive audio is happy, negative is sad."""
+
+    def predict_batch(self, input_features: np.ndarray) -> list[dict]:
+        return [
+            {"emotion": "happy" if f[0] > 0 else "sad", "confidence": round(float(abs(f[0])), 3)}
+            for f in input_features
+        ]
+
+
+class RecordingStore(rescore.SQLiteMessageStore):
+    """SQLite store that records every written id and can fail on a given write."""
+
+    def __init__(self, path, fail_on_write=None):
+        super().__init__(path)
+        self.written_ids = []
+        self.writes = 0
+        self.fail_on_write = fail_on_write
+
+    def update_message_emotions(self, updates):
+        self.writes += 1
+        if self.writes == self.fail_on_write:
+            raise RuntimeError("simulated crash")
+        super().update_message_emotions(updates)
+        self.written_ids.extend(u["id"] for u in updates)
+
+
+@pytest.fixture
+def audio_dir(tmp_path):
+    path = tmp_path / "audio"
+    path.mkdir()
+    for i, message_id in enumerate(MESSAGE_IDS):
+        amplitude = 0.1 * (i + 1) * (1 if i % 2 == 0 else -1)
+        sf.write(path / f"{message_id}.wav", np.full(1600, amplitude, dtype=np.float32), 16000)
+    return path
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "messages.db"
+    rescore.SQLiteMessageStore(str(path))
+    with sqlite3.connect(path) as db:
+        db.executemany(
+            "INSERT INTO messages (id, user_id, role, content) VALUES (?, 'u1', 'user', 'hi')",
+            [(message_id,) for message_id in MESSAGE_IDS],
+        )
+    return path
+
+
+def _run(audio_dir, store, checkpoint):
+    return rescore.rescore(
+        str(audio_dir),
+        StubModel(),
+        store,
+        batch_size=2,
+        write_chunk_size=2,
+        workers=2,
+        prefetch=1,
+        checkpoint=str(checkpoint),
+        load_features=_load_stub_features,
+        initializer=_init_stub_worker,
+    )
+
+
+def _emotions(db_path):
+    with sqlite3.connect(db_path) as db:
+        return dict(db.execute("SELECT id, emotion FROM messages ORDER BY id").fetchall())
+
+
+def test_rescore_updates_rows_and_writes_checkpoint(audio_dir, db_path, tmp_path):
+    checkpoint = tmp_path / "ckpt.json"
+
+    processed = _run(audio_dir, RecordingStore(str(db_path)), checkpoint)
+
+    assert processed == len(MESSAGE_IDS)
+    assert _emotions(db_path) == {
+        message_id: "happy" if i % 2 == 0 else "sad"
+        for i, message_id in enumerate(MESSAGE_IDS)
+    }
+    state = json.loads(checkpoint.read_text())
+    assert state["processed"] == len(MESSAGE_IDS)
+    assert state["last_message_id"] == MESSAGE_IDS[-1]
+    assert state["source"] == str(audio_dir)
+
+
+def test_rescore_resumes_without_skipping_or_duplicating(audio_dir, db_path, tmp_path):
+    checkpoint = tmp_path / "ckpt.json"
+
+    crashing_store = RecordingStore(str(db_path), fail_on_write=2)
+    with pytest.raises(RuntimeError, match="simulated crash"):
+        _run(audio_dir, crashing_store, checkpoint)
+    assert crashing_store.written_ids == MESSAGE_IDS[:2]
+    assert json.loads(checkpoint.read_text())["processed"] == 2
+
+    resumed_store = RecordingStore(str(db_path))
+    _run(audio_dir, resumed_store, checkpoint)
+
+    assert resumed_store.written_ids == MESSAGE_IDS[2:]
+    assert None not in _emotions(db_path).values()
+
+
+def test_rescore_refuses_checkpoint_for_changed_source(audio_dir, db_path, tmp_path):
+    checkpoint = tmp_path / "ckpt.json"
+    crashing_store = RecordingStore(str(db_path), fail_on_write=2)
+    with pytest.raises(RuntimeError, match="simulated crash"):
+        _run(audio_dir, crashing_store, checkpoint)
+
+    (audio_dir / f"{MESSAGE_IDS[0]}.wav").unlink()
+
+    with pytest.raises(RuntimeError, match="does not match"):
+        _run(audio_dir, RecordingStore(str(db_path)), checkpoint)
@@ -0,0 +1,107 @@
+"""
+Tests for the audio storage expiry index and cleanup.
+"""
+
+import os
+
+import pytest
+
+from app.config import settings
+from app.services import storage as storage_module
+from app.services.storage import StorageService
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(storage_module.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch, clock):
+    monkeypatch.setattr(settings, "AUDIO_DIR", str(tmp_path / "audio"))
+    monkeypatch.setattr(settings, "AUDIO_INDEX_PATH", str(tmp_path / "index.sqlite3"))
+    monkeypatch.setattr(settings, "AUDIO_CLEANUP_HOURS", 1)
+    monkeypatch.setattr(settings, "AUDIO_CLEANUP_BATCH_SIZE", 2)
+    return StorageService()
+
+
+def test_save_file_shards_and_indexes(storage):
+    rel_path = storage.save_file("a.mp3", b"abc")
+
+    assert rel_path == storage.path_for("a.mp3")
+    assert len(rel_path.split(os.sep)) == 3
+    with open(storage.absolute_path(rel_path), "rb") as f:
+        assert f.read() == b"abc"
+    assert storage.get_stats()["file_count"] == 1
+    assert storage.get_stats()["total_bytes"] == 3
+
+
+def test_resaving_a_file_does_not_double_count(storage):
+    storage.save_file("a.mp3", b"abc")
+    storage.save_file("a.mp3", b"abcdef")
+
+    stats = storage.get_stats()
+    assert (stats["file_count"], stats["total_bytes"]) == (1, 6)
+
+
+def test_cleanup_deletes_only_expired_files_in_batches(storage, clock):
+    old = [storage.save_file(f"old{i}.mp3", b"xx") for i in range(3)]
+    clock[0] += 1800
+    fresh = storage.save_file("fresh.mp3", b"yyy")
+    clock[0] += 1801  # old files are past their hour, fresh is not
+
+    assert storage.cleanup_expired() == 2
+    assert storage.cleanup_expired() == 1
+    assert storage.cleanup_expired() == 0
+
+    assert not any(os.path.exists(storage.absolute_path(p)) for p in old)
+    assert os.path.exists(storage.absolute_path(fresh))
+    stats = storage.get_stats()
+    assert (stats["file_count"], stats["total_bytes"], stats["deleted_count"]) == (1, 3, 3)
+
+
+def test_touch_extends_expiry(storage, clock):
+    rel_path = storage.save_file("a.mp3", b"abc")
+    clock[0] += 3000
+    assert storage.touch(rel_path)
+    clock[0] += 3000
+
+    assert storage.cleanup_expired() == 0
+    assert storage.touch("missing/path.mp3") is False
+
+
+def test_cleanup_keeps_row_when_file_cannot_be_removed(storage, clock, monkeypatch):
+    rel_path = storage.save_file("a.mp3", b"abc")
+    clock[0] += 7200
+
+    def failing_remove(path):
+        raise PermissionError("denied")
+
+    monkeypatch.setattr(storage_module.os, "remove", failing_remove)
+    assert storage.cleanup_expired() == 0
+    assert storage.get_stats()["file_count"] == 1
+
+    monkeypatch.undo()
+    monkeypatch.setattr(storage_module.time, "time", lambda: clock[0] + settings.AUDIO_CLEANUP_INTERVAL_SECONDS + 1)
+    assert storage.cleanup_expired() == 1
+    assert not os.path.exists(storage.absolute_path(rel_path))
+
+
+def test_new_index_imports_existing_files_by_mtime(tmp_path, monkeypatch, clock):
+    audio_dir = tmp_path / "audio"
+    audio_dir.mkdir()
+    legacy = audio_dir / "legacy.mp3"
+    legacy.write_bytes(b"abcd")
+    os.utime(legacy, (0, 0))  # mtime 0 must not be treated as "now"
+    (audio_dir / "notes.txt").write_text("ignored")
+
+    monkeypatch.setattr(settings, "AUDIO_DIR", str(audio_dir))
+    monkeypatch.setattr(settings, "AUDIO_INDEX_PATH", str(tmp_path / "index.sqlite3"))
+    storage = StorageService()
+
+    assert storage.get_stats()["file_count"] == 1
+    assert storage.get_stats()["next_expiry"] == settings.AUDIO_CLEANUP_HOURS * 3600
+    assert storage.cleanup_expired() == 1
+    assert not legacy.exists()